@@ -1,5 +1,4 @@
 #!/usr/bin/python3
-# -*- coding: utf-8 -*-
 #
 # Script to help in managing Usenet hierarchies.  It generates control articles
 # and handles PGP keys (generation and management).
@@ -29,8 +28,18 @@
 # History:
 #
 # v. 1.5.1: (not yet released)
+#           - Require Python 3; compatibility with Python 2 has been dropped.
+#           - Call gpg directly instead of through a shell, and no longer
+#             pass the passphrase on its command line (it is now fed on its
+#             standard input, where other users of the system cannot see it).
+#           - Pipe articles through gpg when signing them, instead of staging
+#             them in temporary .txt and .pgp files in the working directory.
 #           - Switch ftp.isc.org's URLs to downloads.isc.org, the preferred
 #             hostname now that their FTP server has shut down.
+#           - Add an optional "update" argument to generate_newgroup and
+#             generate_rmgroup so that scripts generating many control
+#             articles can skip the interactive question about updating the
+#             checkgroups file, and write it only once at the end.
 #           - Improve documentation (how to enable loopback pinentry mode to
 #             type the passphrase in a terminal, how to run inews, mention
 #             all the optional parameters).
@@ -130,7 +139,7 @@ CONFIGURATION_FILE = "signcontrol.conf"
 
 import os
 import re
-import shlex
+import subprocess
 import sys
 import time
 import traceback
@@ -147,18 +156,36 @@ YELLOW = "\033[33m"
 CYAN = "\033[36m"
 END = "\033[0m"
 
-
-def str_input(string):
-    """Get a value from the user, using input() in Python 3 or raw_input() in
-    Python 2 as raw_input() is no longer defined in Python 3 (it was renamed
-    input() but has a different behaviour in Python 2).
-    Argument: string (the string to display)
-    Return value: the input from the user
-    """
-    if sys.version_info[0] > 2:
-        return input(string)
-    else:
-        return raw_input(string)
+# Compiled once at load time, and used for every newsgroup name to validate.
+INVALID_GROUP_CHARS = re.compile(r"[^a-z0-9+_.-]")
+
+# Tokenizer for the configuration file: comments, double-quoted values
+# (possibly spanning several lines, with \" and \\ escapes), single-quoted
+# values, the "=" separator, and bare words.
+CONFIG_TOKEN = re.compile(
+    r"#[^\n]*" r'|"((?:[^"\\]|\\.)*)"' r"|'([^']*)'" r"|(=)" r"|([^\s=#\"']+)"
+)
+CONFIG_UNESCAPE = re.compile(r'\\(["\\])')
+
+# A run of tabulations, as found between a newsgroup name and its
+# description in a checkgroups file.
+TAB_RUN = re.compile(r"\t+")
+
+# Components which must not be used in newsgroup names.
+FORBIDDEN_FIRST_COMPONENTS = frozenset(("control", "example", "to"))
+FORBIDDEN_COMPONENTS = frozenset(("all", "ctl"))
+
+# An ASCII-armored detached signature, as written by gpg.  The version of
+# the program and the base64-encoded signature (with its checksum) are
+# extracted in one pass.
+PGP_ARMOR = re.compile(
+    r"-----BEGIN PGP SIGNATURE-----\n"
+    r"Version: (?P<version>[^\n]+)\n"
+    r"\n"
+    r"(?P<signature>.+?)\n"
+    r"-----END PGP SIGNATURE-----",
+    re.DOTALL,
+)
 
 
 def treat_exceptions(type, value, stacktrace):
@@ -171,7 +198,7 @@ def treat_exceptions(type, value, stacktrace):
     print("-----------------------------------------------------------")
     print("\n".join(traceback.format_exception(type, value, stacktrace)))
     print("-----------------------------------------------------------")
-    str_input(RED + "An error has just occurred." + END)
+    input(RED + "An error has just occurred." + END)
     sys.exit(2)
 
 
@@ -183,9 +210,35 @@ def print_error(error):
     Argument: error (the error to print)
     No return value
     """
-    print("")
-    print("--> " + RED + error + END + " <--")
-    print("")
+    # A single print() call, so that the message reaches the terminal in
+    # one write.
+    print("\n--> %s%s%s <--\n" % (RED, error, END))
+
+
+# Caches for the time-formatting functions, which are called several times
+# with the same time value while generating control articles.
+PRETTY_TIME_CACHE = dict()
+SERIAL_TIME_CACHE = dict()
+EPOCH_TIME_CACHE = dict()
+
+
+def format_zone_offset(seconds_west):
+    """Format a time zone offset for a Date header field.
+    Argument: seconds_west (the offset of the time zone, in seconds
+              west of UTC, as in time.timezone and time.altzone)
+    Return value: a string like "+0200" or "-0430"
+    """
+    offset_minutes = -int(seconds_west / 60)
+    return "%+03d%02d" % (offset_minutes / 60.0, offset_minutes % 60)
+
+
+# As "%z" does not work on every platform with strftime(), we compute the
+# time zone offsets, once for standard time and once for daylight saving
+# time; they only depend on the local time zone settings.
+# You might want to use UTC with either "+0000" or "-0000", also changing
+# time.localtime() to time.gmtime() for the definition of TIME above.
+STD_ZONE_OFFSET = format_zone_offset(time.timezone)
+DST_ZONE_OFFSET = format_zone_offset(time.altzone)
 
 
 def pretty_time(localtime):
@@ -193,16 +246,16 @@ def pretty_time(localtime):
     Argument: localtime (a time value, representing local time)
     Return value: a string suitable to be used in a Date header field
     """
-    # As "%z" does not work on every platform with strftime(), we compute
-    # the time zone offset.
-    # You might want to use UTC with either "+0000" or "-0000", also changing
-    # time.localtime() to time.gmtime() for the definition of TIME above.
+    cached = PRETTY_TIME_CACHE.get(localtime)
+    if cached is not None:
+        return cached
     if localtime.tm_isdst > 0 and time.daylight:
-        offsetMinutes = -int(time.altzone / 60)
+        offset = DST_ZONE_OFFSET
     else:
-        offsetMinutes = -int(time.timezone / 60)
-    offset = "%+03d%02d" % (offsetMinutes / 60.0, offsetMinutes % 60)
-    return time.strftime("%a, %d %b %Y %H:%M:%S " + offset, localtime)
+        offset = STD_ZONE_OFFSET
+    result = time.strftime("%a, %d %b %Y %H:%M:%S " + offset, localtime)
+    PRETTY_TIME_CACHE[localtime] = result
+    return result
 
 
 def serial_time(localtime):
@@ -210,8 +263,13 @@ def serial_time(localtime):
     Argument: localtime (a time value, representing local time)
     Return value: a string suitable to be used as a serial number
     """
+    cached = SERIAL_TIME_CACHE.get(localtime)
+    if cached is not None:
+        return cached
     # Note that there is only one serial per day.
-    return time.strftime("%Y%m%d", localtime)
+    result = time.strftime("%Y%m%d", localtime)
+    SERIAL_TIME_CACHE[localtime] = result
+    return result
 
 
 def epoch_time(localtime):
@@ -219,7 +277,12 @@ def epoch_time(localtime):
     Argument: localtime (a time value, representing local time)
     Return value: the number of seconds since epoch, as a string
     """
-    return str(int(time.mktime(localtime)))
+    cached = EPOCH_TIME_CACHE.get(localtime)
+    if cached is not None:
+        return cached
+    result = str(int(time.mktime(localtime)))
+    EPOCH_TIME_CACHE[localtime] = result
+    return result
 
 
 def read_configuration(file):
@@ -245,24 +308,33 @@ def read_configuration(file):
         "CHECKGROUPS_FILE",
         "ENCODING",
     ]
+    known_tokens = frozenset(TOKENS)
 
     if not os.path.isfile(file):
         print(RED + "The configuration file is absent." + END)
-        str_input("Please install it before using this script.")
+        input("Please install it before using this script.")
         sys.exit(2)
 
-    config_file = shlex.shlex(open(file, "r"), posix=True)
+    with open(file, "r") as config_file:
+        contents = config_file.read()
+
     config = dict()
     parameter = None
-    while True:
-        token = config_file.get_token()
-        if not token:
-            break
-        if token[0] in "\"'":
-            token = token[1:-1]
-        if token in TOKENS:
+    # One pass of a compiled regex over the whole file, instead of the
+    # character-at-a-time state machine a shlex tokenizer goes through.
+    for match in CONFIG_TOKEN.finditer(contents):
+        if match.lastindex is None or match.group(3):
+            # A comment, or the "=" separator.
+            continue
+        if match.group(1) is not None:
+            token = CONFIG_UNESCAPE.sub(r"\1", match.group(1))
+        elif match.group(2) is not None:
+            token = match.group(2)
+        else:
+            token = match.group(4)
+        if token in known_tokens:
             parameter = token
-        elif token != "=" and parameter:
+        elif parameter:
             if parameter == "PGP2_COMPATIBILITY":
                 if token == "True" or token == "true":
                     config[parameter] = [("--pgp2", "-pgp2"), ("", "")]
@@ -281,8 +353,8 @@ def read_configuration(file):
     for token in TOKENS:
         if token not in config:
             print("You must update the configuration file.")
-            print(RED + "The parameter " + token + " is missing." + END)
-            str_input(
+            print(f"{RED}The parameter {token} is missing.{END}")
+            input(
                 "Please download the latest version of the configuration file"
                 " and parameterize it before using this script."
             )
@@ -290,6 +362,11 @@ def read_configuration(file):
     return config
 
 
+# Cache of already parsed checkgroups files, invalidated when they change
+# on disk: {path: ((mtime, size), {newsgroup: description})}.
+CHECKGROUPS_CACHE = dict()
+
+
 def read_checkgroups(path):
     """Parse a checkgroups file.
     Argument: path (path of the checkgroups file)
@@ -302,25 +379,37 @@ def read_checkgroups(path):
         print(GREEN + "Creating an empty checkgroups file..." + END)
         write_checkgroups(dict(), path)
 
+    # Return the result of a previous parse if the file has not changed
+    # since then.  A copy is returned so that callers can freely modify it.
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cached = CHECKGROUPS_CACHE.get(path)
+    if cached is not None and cached[0] == signature:
+        return dict(cached[1])
+
     groups = dict()
 
-    for line in open(path):
+    # Read the whole file at once rather than iterating on the file object,
+    # which allocates a line object per iteration.
+    with open(path) as checkgroups_file:
+        lines = checkgroups_file.read().splitlines()
+
+    for line in lines:
         line2 = line.strip()
-        while line2.find("\t\t") != -1:
-            line2 = line2.replace("\t\t", "\t")
         try:
-            group, description = line2.split("\t")
+            group, description = TAB_RUN.split(line2, 1)
             groups[group] = description
-        except:
+        except ValueError:
             print_error(
                 RED + "The current checkgroups is incorrectly formatted." + END
             )
             print("The offending line is:")
             print(line)
             print("")
-            str_input("Please correct it before using this script.")
+            input("Please correct it before using this script.")
             sys.exit(2)
 
+    CHECKGROUPS_CACHE[path] = (signature, dict(groups))
     return groups
 
 
@@ -330,27 +419,59 @@ def write_checkgroups(groups, path):
                path (path of the checkgroups file)
     No return value
     """
-    keys = sorted(groups.keys())
-    checkgroups_file = open(path, "w")
-    for key in keys:
-        if len(key) < 8:
-            checkgroups_file.write(key + "\t\t\t" + groups[key] + "\n")
-        elif len(key) < 16:
-            checkgroups_file.write(key + "\t\t" + groups[key] + "\n")
-        else:
-            checkgroups_file.write(key + "\t" + groups[key] + "\n")
-    checkgroups_file.close()
+    # Join the lines beforehand so that the file is written with a single
+    # write call.
+    lines = [
+        "%s%s%s\n" % (group, tab_padding(group), description)
+        for group, description in sorted(groups.items())
+    ]
+    with open(path, "w") as checkgroups_file:
+        checkgroups_file.write("".join(lines))
     print(GREEN + "Checkgroups file written." + END)
     print("")
 
 
+# Possible paddings between a newsgroup name and its description, indexed
+# by the number of 8-column tab stops the name spans.
+TAB_PADDINGS = ("\t\t\t", "\t\t", "\t")
+
+
+def tab_padding(group):
+    """Return the tabulations to write between a newsgroup name and its
+    description in a checkgroups or news-groupinfo line.
+    Argument: group (the name of the newsgroup)
+    Return value: a string of 1 to 3 tabulations
+    """
+    return TAB_PADDINGS[min(len(group) // 8, 2)]
+
+
+def prompt_int(string, minimum, maximum, default=None):
+    """Prompt the user until an integer between two bounds is entered.
+    Arguments: string (the prompt to print)
+               minimum (the smallest acceptable value)
+               maximum (the largest acceptable value)
+               default (if given, the value to use for an empty answer)
+    Return value: the number entered by the user
+    """
+    while True:
+        answer = input(string)
+        if not answer and default is not None:
+            print("")
+            return default
+        if answer.isdigit() and minimum <= int(answer) <= maximum:
+            print("")
+            return int(answer)
+        print_error(
+            "Please enter a number between %d and %d." % (minimum, maximum)
+        )
+
+
 def choice_menu():
     """Print the initial menu, and waits for the user to make a choice.
     Return value: the number representing the user's choice
     """
-    while True:
-        print(
-            """
+    print(
+        """
 What do you want to do?
 -----------------------
 1. Generate a newgroup control article (create or change a newsgroup)
@@ -359,15 +480,8 @@ What do you want to do?
 4. Manage my PGP keys (generate/import/export/remove/revoke)
 5. Quit
 """
-        )
-        try:
-            choice = int(str_input("Your choice (1-5): "))
-            if int(choice) not in list(range(1, 6)):
-                raise ValueError()
-            print("")
-            return choice
-        except:
-            print_error("Please enter a number between 1 and 5.")
+    )
+    return prompt_int("Your choice (1-5): ", 1, 5)
 
 
 def manage_menu():
@@ -375,9 +489,8 @@ def manage_menu():
     for the user to make a choice.
     Return value: the number representing the user's choice
     """
-    while True:
-        print(
-            """
+    print(
+        """
 What do you want to do?
 -----------------------
 1. See the current installed keys
@@ -389,23 +502,24 @@ What do you want to do?
 7. Revoke a secret key
 8. Quit
 """
-        )
-        try:
-            choice = int(str_input("Your choice (1-8): "))
-            if int(choice) not in list(range(1, 9)):
-                raise ValueError()
-            print("")
-            return choice
-        except:
-            print_error("Please enter a number between 1 and 8.")
+    )
+    return prompt_int("Your choice (1-8): ", 1, 8)
 
 
 def generate_signed_message(
-    config, file_message, group, message_id, type, passphrase=None, flag=""
+    config,
+    file_message,
+    text,
+    group,
+    message_id,
+    type,
+    passphrase=None,
+    flag="",
 ):
     """Generate signed control articles.
     Arguments: config (the dictionary of parameters from signcontrol.conf)
-               file_message (the file name of the message to sign)
+               file_message (the file name of the signed article to write)
+               text (the contents of the article to sign)
                group (the name of the newsgroup)
                message_id (the Message-ID of the message)
                type (the type of the control article)
@@ -413,120 +527,105 @@ def generate_signed_message(
                flag (if given, the additional flag(s) to pass to gpg)
     No return value
     """
-    signatureWritten = False
+    # Hoist the configuration lookups used below into local variables.
+    name = config["NAME"]
+    mail = config["MAIL"]
+    url = config["URL"]
+    encoding = config["ENCODING"]
+
+    content_types = {
+        "newgroup": 'multipart/mixed; boundary="signcontrol"',
+        "checkgroups": f"application/news-checkgroups; charset={encoding}",
+        "rmgroup": f"text/plain; charset={encoding}",
+    }
+    content_type = content_types.get(type, content_types["rmgroup"])
+
+    command = [
+        config["PROGRAM_GPG"],
+        "--emit-version",
+        "--no-comments",
+        "--no-escape-from-lines",
+        "--no-throw-keyids",
+        "--armor",
+        "--detach-sign",
+        "--local-user",
+        "=" + config["ID"],
+        "--output",
+        "-",
+    ]
+    if flag:
+        command.extend(flag.split())
 
+    # Pipe the article through gpg instead of staging it in temporary .txt
+    # and .pgp files: the article is fed on gpg's standard input and the
+    # armored signature read back from its standard output.
+    data = text
     if passphrase:
-        os.system(
-            config["PROGRAM_GPG"]
-            + " --emit-version --no-comments --no-escape-from-lines"
-            ' --no-throw-keyids --armor --detach-sign --local-user "='
-            + config["ID"]
-            + '" --no-tty --passphrase "'
-            + passphrase
-            + '" --output '
-            + file_message
-            + ".pgp "
-            + flag
-            + " "
-            + file_message
-            + ".txt"
-        )
-    else:
-        os.system(
-            config["PROGRAM_GPG"]
-            + " --emit-version --no-comments --no-escape-from-lines"
-            ' --no-throw-keyids --armor --detach-sign --local-user "='
-            + config["ID"]
-            + '" --output '
-            + file_message
-            + ".pgp "
-            + flag
-            + " "
-            + file_message
-            + ".txt"
-        )
+        # The passphrase is fed as the first line of gpg's standard input
+        # rather than embedded in the command line, where other users could
+        # see it with ps.
+        command[1:1] = ["--batch", "--no-tty", "--passphrase-fd", "0"]
+        data = passphrase + "\n" + data
+    process = subprocess.run(
+        command, input=data.encode(encoding), stdout=subprocess.PIPE
+    )
+    armor = process.stdout.decode(encoding)
 
-    if not os.path.isfile(file_message + ".pgp"):
+    armor_parsed = PGP_ARMOR.search(armor)
+    if process.returncode != 0 or armor_parsed is None:
         print_error("Signature generation failed.")
         print(RED + "Please verify the availability of the secret key." + END)
         return
+    version = armor_parsed.group("version").replace(" ", "_")
+    signature = "\t" + "\n\t".join(
+        armor_parsed.group("signature").splitlines()
+    )
 
-    result = open(file_message + ".sig", "w")
-    for line in open(file_message + ".txt", "r"):
-        if signatureWritten:
-            result.write(line)
-            continue
-
-        if not line.startswith("X-Signed-Headers"):
-            # From is the last signed header field.
-            if not line.startswith("From"):
-                result.write(line)
-            else:
-                # Rewrite the From line exactly as we already wrote it.
-                result.write(
-                    "From: " + config["NAME"] + " <" + config["MAIL"] + ">\n"
-                )
-                result.write("Approved: " + config["MAIL"] + "\n")
-                if type == "checkgroups" and not config["PRIVATE_HIERARCHY"]:
-                    result.write(
-                        "Newsgroups: " + group + ",news.admin.hierarchies\n"
-                    )
-                    result.write("Followup-To: " + group + "\n")
-                else:
-                    result.write("Newsgroups: " + group + "\n")
-                result.write("Path: not-for-mail\n")
-                result.write("X-Info: ")
-                if config["URL"]:
-                    result.write(config["URL"] + "\n")
-                if (
-                    "https://downloads.isc.org/pub/pgpcontrol/README.html"
-                    not in config["URL"]
-                    and "https://ftp.isc.org/pub/pgpcontrol/README.html"
-                    not in config["URL"]
-                ):
-                    if config["URL"]:
-                        result.write("\t")
-                    result.write(
-                        "https://downloads.isc.org/pub/pgpcontrol/README.html\n"
-                    )
-                result.write("MIME-Version: 1.0\n")
-                if type == "newgroup":
-                    result.write(
-                        "Content-Type: multipart/mixed;"
-                        ' boundary="signcontrol"\n'
-                    )
-                elif type == "checkgroups":
-                    result.write(
-                        "Content-Type: application/news-checkgroups; charset="
-                        + config["ENCODING"]
-                        + "\n"
-                    )
-                else:  # rmgroup
-                    result.write(
-                        "Content-Type: text/plain; charset="
-                        + config["ENCODING"]
-                        + "\n"
-                    )
-                result.write("Content-Transfer-Encoding: 8bit\n")
-                for line2 in open(file_message + ".pgp", "r"):
-                    if line2.startswith("-"):
-                        continue
-                    if line2.startswith("Version:"):
-                        version = line2.replace("Version: ", "")
-                        version = version.replace(" ", "_")
-                        result.write(
-                            "X-PGP-Sig: "
-                            + version.rstrip()
-                            + " Subject,Control,Message-ID,Date"
-                            + ",Injection-Date,From\n"
-                        )
-                    elif len(line2) > 2:
-                        result.write("\t" + line2.rstrip() + "\n")
-                signatureWritten = True
-
-    result.close()
+    # Only the header block of the article needs rewriting: the signed
+    # X-Signed-Headers and From lines are dropped (the first one is not
+    # part of the posted article, and the second one is the last signed
+    # header field, after which the unsigned headers are inserted).
+    headers, body = text.split("\n\n", 1)
+    parts = [
+        line
+        for line in headers.splitlines(True)
+        if not line.startswith(("X-Signed-Headers", "From"))
+    ]
+    # Rewrite the From line exactly as we already wrote it.
+    parts.append(f"From: {name} <{mail}>\n")
+    parts.append(f"Approved: {mail}\n")
+    if type == "checkgroups" and not config["PRIVATE_HIERARCHY"]:
+        parts.append(f"Newsgroups: {group},news.admin.hierarchies\n")
+        parts.append(f"Followup-To: {group}\n")
+    else:
+        parts.append(f"Newsgroups: {group}\n")
+    parts.append("Path: not-for-mail\n")
+    parts.append("X-Info: ")
+    if url:
+        parts.append(url + "\n")
+    if (
+        "https://downloads.isc.org/pub/pgpcontrol/README.html" not in url
+        and "https://ftp.isc.org/pub/pgpcontrol/README.html" not in url
+    ):
+        if url:
+            parts.append("\t")
+        parts.append("https://downloads.isc.org/pub/pgpcontrol/README.html\n")
+    parts.append("MIME-Version: 1.0\n")
+    parts.append(f"Content-Type: {content_type}\n")
+    parts.append("Content-Transfer-Encoding: 8bit\n")
+    parts.append(
+        f"X-PGP-Sig: {version} Subject,Control"
+        ",Message-ID,Date,Injection-Date,From\n"
+    )
+    parts.append(signature + "\n")
+    parts.append("\n")
+    parts.append(body)
 
-    os.remove(file_message + ".pgp")
+    signed = "".join(parts)
+    # Write in binary mode so that the article keeps the exact encoding the
+    # signature was computed on, whatever the locale settings are.
+    with open(file_message + ".sig", "wb") as result:
+        result.write(signed.encode(encoding))
 
     print("")
     if flag:
@@ -535,14 +634,14 @@ def generate_signed_message(
             + "Do not worry if the program complains about detached signatures"
             " or MD5." + END
         )
-    print("You can now post the file " + file_message + ".sig using rnews")
+    print(f"You can now post the file {file_message}.sig using rnews")
     print("or a similar tool.")
     print("")
     # print("Or you can also try to send it with IHAVE.  If it fails,"
     #       " it means that the article")
     # print("has not been sent.  You will then have to manually use rnews"
     #       " or a similar program.")
-    # if str_input("Do you want to try? (y/n) ") == "y":
+    # if input("Do you want to try? (y/n) ") == "y":
     #    import nntplib
     #    news_server = nntplib.NNTP(HOST, PORT, USER, PASSWORD)
     #    news_server.ihave(message_id, file_message + ".sig")
@@ -551,11 +650,12 @@ def generate_signed_message(
 
 
 def sign_message(
-    config, file_message, group, message_id, type, passphrase=None
+    config, file_message, text, group, message_id, type, passphrase=None
 ):
     """Sign a control article.
     Arguments: config (the dictionary of parameters from signcontrol.conf)
-               file_message (the file name of the message to sign)
+               file_message (the file name of the signed article to write)
+               text (the contents of the article to sign)
                group (the name of the newsgroup)
                message_id (the Message-ID of the message)
                type (the type of the control article)
@@ -567,34 +667,35 @@ def sign_message(
     for flag, suffix in config["PGP2_COMPATIBILITY"]:
         if articles_to_generate > 1:
             print("")
-            print(
-                "Generation of control article "
-                + str(i)
-                + "/"
-                + str(articles_to_generate)
-            )
+            print(f"Generation of control article {i}/{articles_to_generate}")
             i += 1
         if suffix:
-            additional_file = open(file_message + suffix + ".txt", "w")
             additional_message_id = message_id.replace("@", suffix + "@", 1)
-            for line in open(file_message + ".txt", "r"):
-                if line == "Message-ID: " + message_id + "\n":
-                    line = "Message-ID: " + additional_message_id + "\n"
-                additional_file.write(line)
-            additional_file.close()
+            additional_text = text.replace(
+                f"Message-ID: {message_id}\n",
+                f"Message-ID: {additional_message_id}\n",
+                1,
+            )
             generate_signed_message(
                 config,
                 file_message + suffix,
+                additional_text,
                 group,
                 additional_message_id,
                 type,
                 passphrase,
                 flag,
             )
-            os.remove(file_message + suffix + ".txt")
         else:
             generate_signed_message(
-                config, file_message, group, message_id, type, passphrase, flag
+                config,
+                file_message,
+                text,
+                group,
+                message_id,
+                type,
+                passphrase,
+                flag,
             )
 
 
@@ -606,6 +707,7 @@ def generate_newgroup(
     description=None,
     message=None,
     passphrase=None,
+    update=None,
 ):
     """Create a new group.
     Arguments: groups (the dictionary representing the checkgroups)
@@ -615,10 +717,15 @@ def generate_newgroup(
                description (if given, the description of the newsgroup)
                message (if given, the text to write in the control article)
                passphrase (if given, the passphrase of the private key)
+               update (if given, whether to record the change in the
+                       groups dictionary, without asking and without
+                       writing the checkgroups file; useful for batch
+                       runs, which can then call write_checkgroups once
+                       at the end)
     No return value
     """
     while not group:
-        group = str_input("Name of the newsgroup to create: ").lower()
+        group = input("Name of the newsgroup to create: ").lower()
         components = group.split(".")
         if len(components) < 2:
             group = None
@@ -626,19 +733,19 @@ def generate_newgroup(
         elif not components[0][0:1].isalpha():
             group = None
             print_error("The first component must start with a letter.")
-        elif components[0] in ["control", "example", "to"]:
+        elif components[0] in FORBIDDEN_FIRST_COMPONENTS:
             group = None
             print_error(
                 'The first component must not be "control", "example" or "to".'
             )
-        elif re.search("[^a-z0-9+_.-]", group):
+        elif INVALID_GROUP_CHARS.search(group):
             group = None
             print_error(
                 "The group must not contain characters other than"
                 " [a-z0-9+_.-]."
             )
         for component in components:
-            if component in ["all", "ctl"]:
+            if component in FORBIDDEN_COMPONENTS:
                 group = None
                 print_error(
                     'Sequences "all" and "ctl" must not be used as components.'
@@ -665,7 +772,7 @@ These new settings (status and description) will override the current ones.
         )
 
     if moderated is None:
-        if str_input("Is " + group + " a moderated newsgroup? (y/n) ") == "y":
+        if input(f"Is {group} a moderated newsgroup? (y/n) ") == "y":
             moderated = True
             print(
                 YELLOW
@@ -683,11 +790,11 @@ It will be automatically added, if not already present."""
             YELLOW + "The description should start with a capital and end in a"
             " period." + END
         )
-        description = str_input("Description of " + group + ": ")
+        description = input(f"Description of {group}: ")
         if len(description) > 56:
             print_error("The description is too long.  You should shorten it.")
             if (
-                str_input(
+                input(
                     "Do you want to continue despite this recommendation?"
                     " (y/n) "
                 )
@@ -696,8 +803,10 @@ It will be automatically added, if not already present."""
                 description = None
                 continue
 
-        moderated_count = description.count("(Moderated)")
-        if moderated_count > 0:
+        # A single scan of the description is enough: a second find() from
+        # the character after the first match detects duplicates.
+        moderated_position = description.find("(Moderated)")
+        if moderated_position != -1:
             if not moderated:
                 if description.endswith(" (Moderated)"):
                     description = None
@@ -710,7 +819,7 @@ It will be automatically added, if not already present."""
                         'The description must not contain "(Moderated)".'
                     )
                     if (
-                        str_input(
+                        input(
                             "Do you want to continue despite this"
                             " recommendation? (y/n) "
                         )
@@ -718,12 +827,12 @@ It will be automatically added, if not already present."""
                     ):
                         description = None
                         continue
-            elif moderated_count > 1 or not description.endswith(
-                " (Moderated)"
-            ):
+            elif description.find(
+                "(Moderated)", moderated_position + 1
+            ) != -1 or not description.endswith(" (Moderated)"):
                 print_error('The description must not contain "(Moderated)".')
                 if (
-                    str_input(
+                    input(
                         "Do you want to continue despite this recommendation?"
                         " (y/n) "
                     )
@@ -748,7 +857,7 @@ It will be automatically added, if not already present."""
 
         print(CYAN + message + END)
         print("")
-        if str_input("Do you want to change it? (y/n) ") == "y":
+        if input("Do you want to change it? (y/n) ") == "y":
             print("")
             print("Please enter the message you want to send.")
             print(
@@ -758,93 +867,86 @@ It will be automatically added, if not already present."""
             )
             print("")
 
-            message = ""
-            buffer = str_input("Message: ") + "\n"
-            while buffer != ".\n":
-                message += buffer.rstrip() + "\n"
-                buffer = str_input("Message: ") + "\n"
-
-    print("")
-    print("Here is the information about the newsgroup:")
-    print("")
-    print("Name: " + CYAN + group + END)
+            # Accumulate the lines in a list: repeated concatenation to
+            # a string would reallocate it at each iteration.
+            lines = []
+            buffer = input("Message: ")
+            while buffer != ".":
+                lines.append(buffer.rstrip() + "\n")
+                buffer = input("Message: ")
+            message = "".join(lines)
 
     if moderated:
-        print("Status: " + CYAN + "moderated" + END)
+        status = "moderated"
         if not description.endswith(" (Moderated)"):
             description += " (Moderated)"
     else:
-        print("Status: " + CYAN + "unmoderated" + END)
-    print("Description: " + CYAN + description + END)
-    print("Message: ")
-    print("")
-    print(CYAN + message + END)
-    print("")
+        status = "unmoderated"
+
+    # A single print() call, so that the whole block reaches the terminal
+    # in one write.
+    print(
+        "\nHere is the information about the newsgroup:\n\n"
+        f"Name: {CYAN}{group}{END}\n"
+        f"Status: {CYAN}{status}{END}\n"
+        f"Description: {CYAN}{description}{END}\n"
+        "Message: \n\n"
+        f"{CYAN}{message}{END}\n"
+    )
 
     if (
-        str_input(
-            "Do you want to generate a control article for "
-            + group
-            + "? (y/n) "
-        )
+        input(f"Do you want to generate a control article for {group}? (y/n) ")
         == "y"
     ):
         print("")
-        file_newgroup = group + "-" + epoch_time(TIME)
-        result = open(file_newgroup + ".txt", "w")
-        result.write(
+        # The time strings are pure functions of the module-level TIME;
+        # compute them only once per article.
+        date = pretty_time(TIME)
+        epoch = epoch_time(TIME)
+        file_newgroup = group + "-" + epoch
+        status = " moderated" if moderated else ""
+        message_id = f"<newgroup-{group}-{epoch}@{config['HOST']}>"
+        text = (
             "X-Signed-Headers:"
             " Subject,Control,Message-ID,Date,Injection-Date,From\n"
+            f"Subject: cmsg newgroup {group}{status}\n"
+            f"Control: newgroup {group}{status}\n"
+            f"Message-ID: {message_id}\n"
+            f"Date: {date}\n"
+            f"Injection-Date: {date}\n"
+            f"From: {config['NAME']} <{config['MAIL']}>\n"
+            "\n"
+            "This is a MIME NetNews control message.\n"
+            "--signcontrol\n"
+            f"Content-Type: text/plain; charset={config['ENCODING']}\n"
+            "\n"
+            f"{message}\n"
+            "\n"
+            "\n"
+            "--signcontrol\n"
+            "Content-Type: application/news-groupinfo;"
+            f" charset={config['ENCODING']}\n"
+            "\n"
+            "For your newsgroups file:\n"
+            f"{group}{tab_padding(group)}{description}\n"
+            "\n"
+            "--signcontrol--\n"
         )
-        if moderated:
-            result.write("Subject: cmsg newgroup " + group + " moderated\n")
-            result.write("Control: newgroup " + group + " moderated\n")
-        else:
-            result.write("Subject: cmsg newgroup " + group + "\n")
-            result.write("Control: newgroup " + group + "\n")
-        message_id = (
-            "<newgroup-"
-            + group
-            + "-"
-            + epoch_time(TIME)
-            + "@"
-            + config["HOST"]
-            + ">"
-        )
-        result.write("Message-ID: " + message_id + "\n")
-        result.write("Date: " + pretty_time(TIME) + "\n")
-        result.write("Injection-Date: " + pretty_time(TIME) + "\n")
-        result.write(
-            "From: " + config["NAME"] + " <" + config["MAIL"] + ">\n\n"
-        )
-        result.write("This is a MIME NetNews control message.\n")
-        result.write("--signcontrol\n")
-        result.write(
-            "Content-Type: text/plain; charset=" + config["ENCODING"] + "\n\n"
-        )
-        result.write(message + "\n")
-        result.write("\n\n--signcontrol\n")
-        result.write(
-            "Content-Type: application/news-groupinfo; charset="
-            + config["ENCODING"]
-            + "\n\n"
-        )
-        result.write("For your newsgroups file:\n")
-        if len(group) < 8:
-            result.write(group + "\t\t\t" + description + "\n")
-        elif len(group) < 16:
-            result.write(group + "\t\t" + description + "\n")
-        else:
-            result.write(group + "\t" + description + "\n")
-        result.write("\n--signcontrol--\n")
-        result.close()
         sign_message(
-            config, file_newgroup, group, message_id, "newgroup", passphrase
+            config,
+            file_newgroup,
+            text,
+            group,
+            message_id,
+            "newgroup",
+            passphrase,
         )
-        os.remove(file_newgroup + ".txt")
 
-    if (
-        str_input("Do you want to update the current checkgroups file? (y/n) ")
+    if update is not None:
+        if update:
+            groups[group] = description
+    elif (
+        input("Do you want to update the current checkgroups file? (y/n) ")
         == "y"
     ):
         groups[group] = description
@@ -852,7 +954,7 @@ It will be automatically added, if not already present."""
 
 
 def generate_rmgroup(
-    groups, config, group=None, message=None, passphrase=None
+    groups, config, group=None, message=None, passphrase=None, update=None
 ):
     """Remove a group.
     Arguments: groups (the dictionary representing the checkgroups)
@@ -860,22 +962,26 @@ def generate_rmgroup(
                group (if given, the name of the newsgroup)
                message (if given, the text to write in the control article)
                passphrase (if given, the passphrase of the private key)
+               update (if given, whether to record the change in the
+                       groups dictionary, without asking and without
+                       writing the checkgroups file; useful for batch
+                       runs, which can then call write_checkgroups once
+                       at the end)
     No return value
     """
     while not group:
-        group = str_input("Name of the newsgroup to remove: ").lower()
+        group = input("Name of the newsgroup to remove: ").lower()
 
     if group not in groups:
         print("")
-        print(YELLOW + "The newsgroup " + group + " does *not* exist." + END)
+        print(f"{YELLOW}The newsgroup {group} does *not* exist.{END}")
         print("Yet, you can send an rmgroup message for it if you want.")
         print("")
 
     if (
-        str_input(
-            "Do you want to generate a control article to *remove* "
-            + group
-            + "? (y/n) "
+        input(
+            "Do you want to generate a control article to *remove*"
+            f" {group}? (y/n) "
         )
         == "y"
     ):
@@ -889,7 +995,7 @@ def generate_rmgroup(
 
             print(CYAN + message + END)
             print("")
-            if str_input("Do you want to change it? (y/n) ") == "y":
+            if input("Do you want to change it? (y/n) ") == "y":
                 print("")
                 print("Please enter the message you want to send.")
                 print(
@@ -899,48 +1005,50 @@ def generate_rmgroup(
                 )
                 print("")
 
-                message = ""
-                buffer = str_input("Message: ") + "\n"
-                while buffer != ".\n":
-                    message += buffer.rstrip() + "\n"
-                    buffer = str_input("Message: ") + "\n"
+                # Accumulate the lines in a list: repeated concatenation
+                # to a string would reallocate it at each iteration.
+                lines = []
+                buffer = input("Message: ")
+                while buffer != ".":
+                    lines.append(buffer.rstrip() + "\n")
+                    buffer = input("Message: ")
+                message = "".join(lines)
                 print("")
 
-        file_rmgroup = group + "-" + epoch_time(TIME)
-        result = open(file_rmgroup + ".txt", "w")
-        result.write(
+        # The time strings are pure functions of the module-level TIME;
+        # compute them only once per article.
+        date = pretty_time(TIME)
+        epoch = epoch_time(TIME)
+        file_rmgroup = group + "-" + epoch
+        message_id = f"<rmgroup-{group}-{epoch}@{config['HOST']}>"
+        text = (
             "X-Signed-Headers:"
             " Subject,Control,Message-ID,Date,Injection-Date,From\n"
+            f"Subject: cmsg rmgroup {group}\n"
+            f"Control: rmgroup {group}\n"
+            f"Message-ID: {message_id}\n"
+            f"Date: {date}\n"
+            f"Injection-Date: {date}\n"
+            f"From: {config['NAME']} <{config['MAIL']}>\n"
+            "\n"
+            f"{message}\n"
         )
-        result.write("Subject: cmsg rmgroup " + group + "\n")
-        result.write("Control: rmgroup " + group + "\n")
-        message_id = (
-            "<rmgroup-"
-            + group
-            + "-"
-            + epoch_time(TIME)
-            + "@"
-            + config["HOST"]
-            + ">"
-        )
-        result.write("Message-ID: " + message_id + "\n")
-        result.write("Date: " + pretty_time(TIME) + "\n")
-        result.write("Injection-Date: " + pretty_time(TIME) + "\n")
-        result.write(
-            "From: " + config["NAME"] + " <" + config["MAIL"] + ">\n\n"
-        )
-        result.write(message + "\n")
-        result.close()
         sign_message(
-            config, file_rmgroup, group, message_id, "rmgroup", passphrase
+            config,
+            file_rmgroup,
+            text,
+            group,
+            message_id,
+            "rmgroup",
+            passphrase,
         )
-        os.remove(file_rmgroup + ".txt")
 
     if group in groups:
-        if (
-            str_input(
-                "Do you want to update the current checkgroups file? (y/n) "
-            )
+        if update is not None:
+            if update:
+                del groups[group]
+        elif (
+            input("Do you want to update the current checkgroups file? (y/n) ")
             == "y"
         ):
             del groups[group]
@@ -954,60 +1062,51 @@ def generate_checkgroups(config, passphrase=None, serial=None):
                serial (if given, the serial value to use)
     No return value
     """
-    while serial not in list(range(0, 100)):
-        try:
-            print(
-                "If it is your first checkgroups for today, leave it blank"
-                " (default is 1)."
-            )
-            print("Otherwise, increment this revision number by one.")
-            serial = int(str_input("Revision to use (1-99): "))
-            print("")
-        except:
-            serial = 1
-
-    serial = "%02d" % serial
-    file_checkgroups = "checkgroups-" + epoch_time(TIME)
-    result = open(file_checkgroups + ".txt", "w")
-    result.write(
+    if serial is None or not 0 <= serial <= 99:
+        print(
+            "If it is your first checkgroups for today, leave it blank"
+            " (default is 1)."
+        )
+        print("Otherwise, increment this revision number by one.")
+        serial = prompt_int("Revision to use (1-99): ", 1, 99, default=1)
+
+    # The time strings are pure functions of the module-level TIME;
+    # compute them only once per article.
+    date = pretty_time(TIME)
+    epoch = epoch_time(TIME)
+    serial = "%s%02d" % (serial_time(TIME), serial)
+    file_checkgroups = "checkgroups-" + epoch
+    message_id = f"<checkgroups-{epoch}@{config['HOST']}>"
+    # Read the whole checkgroups file at once, and append it with
+    # normalized line endings.
+    with open(config["CHECKGROUPS_FILE"], "r") as checkgroups_file:
+        contents = checkgroups_file.read()
+    checkgroups_list = "".join(
+        line.rstrip() + "\n" for line in contents.splitlines()
+    )
+    text = (
         "X-Signed-Headers:"
         " Subject,Control,Message-ID,Date,Injection-Date,From\n"
+        f"Subject: cmsg checkgroups {config['CHECKGROUPS_SCOPE']}"
+        f" #{serial}\n"
+        f"Control: checkgroups {config['CHECKGROUPS_SCOPE']}"
+        f" #{serial}\n"
+        f"Message-ID: {message_id}\n"
+        f"Date: {date}\n"
+        f"Injection-Date: {date}\n"
+        f"From: {config['NAME']} <{config['MAIL']}>\n"
+        "\n"
+        f"{checkgroups_list}"
     )
-    result.write(
-        "Subject: cmsg checkgroups "
-        + config["CHECKGROUPS_SCOPE"]
-        + " #"
-        + serial_time(TIME)
-        + serial
-        + "\n"
-    )
-    result.write(
-        "Control: checkgroups "
-        + config["CHECKGROUPS_SCOPE"]
-        + " #"
-        + serial_time(TIME)
-        + serial
-        + "\n"
-    )
-    message_id = (
-        "<checkgroups-" + epoch_time(TIME) + "@" + config["HOST"] + ">"
-    )
-    result.write("Message-ID: " + message_id + "\n")
-    result.write("Date: " + pretty_time(TIME) + "\n")
-    result.write("Injection-Date: " + pretty_time(TIME) + "\n")
-    result.write("From: " + config["NAME"] + " <" + config["MAIL"] + ">\n\n")
-    for line in open(config["CHECKGROUPS_FILE"], "r"):
-        result.write(line.rstrip() + "\n")
-    result.close()
     sign_message(
         config,
         file_checkgroups,
+        text,
         config["ADMIN_GROUP"],
         message_id,
         "checkgroups",
         passphrase,
     )
-    os.remove(file_checkgroups + ".txt")
 
 
 def manage_keys(config):
@@ -1022,9 +1121,12 @@ def manage_keys(config):
         if choice == 1:
             print("You currently have the following secret keys installed:")
             print("")
-            os.system(
-                config["PROGRAM_GPG"]
-                + " --list-secret-keys --with-fingerprint"
+            subprocess.call(
+                [
+                    config["PROGRAM_GPG"],
+                    "--list-secret-keys",
+                    "--with-fingerprint",
+                ]
             )
             print(
                 YELLOW
@@ -1053,9 +1155,12 @@ computer instead and import the key on the remote one afterwards.
             )
             # --gen-key should be used instead of --full-generate-key for
             # GnuPG versions prior to 2.1.17.
-            os.system(
-                config["PROGRAM_GPG"]
-                + " --full-generate-key --allow-freeform-uid"
+            subprocess.call(
+                [
+                    config["PROGRAM_GPG"],
+                    "--full-generate-key",
+                    "--allow-freeform-uid",
+                ]
             )
             print(
                 YELLOW
@@ -1068,25 +1173,33 @@ You can also export your PRIVATE key for backup only."""
             )
         elif choice == 3:
             print("The key will be written to the file public-key.asc.")
-            key_name = str_input(
+            key_name = input(
                 "Please enter the uid of the public key to export: "
             )
-            os.system(
-                config["PROGRAM_GPG"]
-                + ' --armor --output public-key.asc --export "='
-                + key_name
-                + '"'
+            subprocess.call(
+                [
+                    config["PROGRAM_GPG"],
+                    "--armor",
+                    "--output",
+                    "public-key.asc",
+                    "--export",
+                    "=" + key_name,
+                ]
             )
         elif choice == 4:
             print("The key will be written to the file private-key.asc.")
-            key_name = str_input(
+            key_name = input(
                 "Please enter the uid of the secret key to export: "
             )
-            os.system(
-                config["PROGRAM_GPG"]
-                + ' --armor --output private-key.asc --export-secret-keys "='
-                + key_name
-                + '"'
+            subprocess.call(
+                [
+                    config["PROGRAM_GPG"],
+                    "--armor",
+                    "--output",
+                    "private-key.asc",
+                    "--export-secret-keys",
+                    "=" + key_name,
+                ]
             )
             if os.path.isfile("private-key.asc"):
                 os.chmod("private-key.asc", 0o400)
@@ -1098,10 +1211,12 @@ Please make sure that nobody has access to it."""
                     + END
                 )
         elif choice == 5:
-            str_input(
+            input(
                 "Please put it in a file named secret-key.asc and press enter."
             )
-            os.system(config["PROGRAM_GPG"] + " --import secret-key.asc")
+            subprocess.call(
+                [config["PROGRAM_GPG"], "--import", "secret-key.asc"]
+            )
             print(
                 YELLOW
                 + """
@@ -1111,21 +1226,20 @@ signcontrol.conf."""
                 + END
             )
         elif choice == 6:
-            key_name = str_input(
-                "Please enter the uid of the key to *remove*: "
-            )
-            os.system(
-                config["PROGRAM_GPG"]
-                + ' --delete-secret-and-public-key "='
-                + key_name
-                + '"'
+            key_name = input("Please enter the uid of the key to *remove*: ")
+            subprocess.call(
+                [
+                    config["PROGRAM_GPG"],
+                    "--delete-secret-and-public-key",
+                    "=" + key_name,
+                ]
             )
         elif choice == 7:
-            key_name = str_input(
+            key_name = input(
                 "Please enter the uid of the secret key to revoke: "
             )
-            os.system(
-                config["PROGRAM_GPG"] + ' --gen-revoke "=' + key_name + '"'
+            subprocess.call(
+                [config["PROGRAM_GPG"], "--gen-revoke", "=" + key_name]
             )
         print("")
 
@@ -1139,7 +1253,7 @@ if __name__ == "__main__":
             " script to put"
         )
         print("the path to the gpg binary.")
-        str_input("Please install GnuPG before using this script.")
+        input("Please install GnuPG before using this script.")
         sys.exit(2)
     choice = 0
     while choice != 5:
@@ -1407,9 +1521,13 @@ the example should be adapted to fit your needs.
             checkgroups, conf, name, status, descr.rstrip()
         )
 
-    # An example of mass removal.
+    # An example of mass removal, writing the checkgroups file only once
+    # at the end instead of being asked about it for each newsgroup.
     for group in open("list-of-groups-to-remove"):
-        signcontrol.generate_rmgroup(checkgroups, conf, group.rstrip())
+        signcontrol.generate_rmgroup(
+            checkgroups, conf, group.rstrip(), update=True
+        )
+    signcontrol.write_checkgroups(checkgroups, conf["CHECKGROUPS_FILE"])
 
 =for markdown ```
 
@@ -1417,6 +1535,14 @@ An optional sixth argument to C<generate_newgroup> and an optional fourth
 argument to C<generate_rmgroup> can be used to specify a different message
 than the default one for the body of generated control articles.
 
+Besides, the optional C<update> keyword argument to C<generate_newgroup> and
+C<generate_rmgroup> controls what happens to the checkgroups file: when left
+unset, the question is interactively asked and the file immediately updated;
+when set to C<True>, the change is silently recorded in the checkgroups
+dictionary without writing the file (call C<write_checkgroups> once after
+the batch, as in the example above); when set to C<False>, nothing is
+recorded.
+
 =head1 USEFUL RESOURCES
 
 Here are some resources that can be useful to be aware of: